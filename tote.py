@@ -1,18 +1,26 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 from reportlab.lib.pagesizes import landscape
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Spacer, Paragraph, PageBreak, Image
+from reportlab.platypus import Table, TableStyle, Image
+from reportlab.pdfgen.canvas import Canvas
+from pypdf import PdfWriter
 from reportlab.lib.units import cm, inch
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-from reportlab.lib.utils import ImageReader
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 import subprocess
 import sys
 import re
 import tempfile
+import importlib
+import importlib.util
+import multiprocessing
+import math
 
 # Define sticker dimensions - Fixed as per original code
 STICKER_WIDTH = 10 * cm
@@ -26,58 +34,148 @@ CONTENT_BOX_HEIGHT = 3 * cm
 # Fixed column width proportions for the 7-box layout (no sliders)
 COLUMN_WIDTH_PROPORTIONS = [1.0, 1.9, 0.8, 0.8, 0.7, 0.7, 0.8]
 
+# Fixed row heights for the sticker content box
+HEADER_ROW_HEIGHT = 0.6 * cm
+DESC_ROW_HEIGHT = 0.8 * cm
+QTY_ROW_HEIGHT = 0.5 * cm
+LOCATION_ROW_HEIGHT = 0.5 * cm
+STICKER_ROW_HEIGHTS = [HEADER_ROW_HEIGHT, DESC_ROW_HEIGHT, QTY_ROW_HEIGHT, LOCATION_ROW_HEIGHT, LOCATION_ROW_HEIGHT]
+
+# Fixed column widths for the sticker content box
+QR_WIDTH = 1.5 * cm
+MAIN_CONTENT_WIDTH = CONTENT_BOX_WIDTH - QR_WIDTH
+HEADER_COL_WIDTH = MAIN_CONTENT_WIDTH * 0.22
+CONTENT_COL_WIDTH = MAIN_CONTENT_WIDTH * 0.71
+INNER_COL_WIDTHS = [w * CONTENT_COL_WIDTH / sum(COLUMN_WIDTH_PROPORTIONS) for w in COLUMN_WIDTH_PROPORTIONS]
+QR_COL_WIDTH = CONTENT_BOX_WIDTH - HEADER_COL_WIDTH - CONTENT_COL_WIDTH
+STICKER_COL_WIDTHS = [HEADER_COL_WIDTH] + INNER_COL_WIDTHS + [QR_COL_WIDTH]
+
 # Fixed content positioning
 CONTENT_LEFT_OFFSET = 1.4 * cm
-
-# Check for PIL and install if needed
-try:
-    from PIL import Image as PILImage
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    st.error("Installing PIL...")
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'pillow'])
-    from PIL import Image as PILImage
-    PIL_AVAILABLE = True
-
-# Check for QR code library and install if needed
-try:
-    import qrcode
-    QR_AVAILABLE = True
-except ImportError:
-    QR_AVAILABLE = False
-    st.error("Installing qrcode...")
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'qrcode'])
-    import qrcode
-    QR_AVAILABLE = True
-
-# Define paragraph styles - Fixed font sizes as per original
-bold_style = ParagraphStyle(name='Bold', fontName='Helvetica-Bold', fontSize=9, alignment=TA_CENTER, leading=10)
-desc_style = ParagraphStyle(name='Desc', fontName='Helvetica', fontSize=7, alignment=TA_LEFT, leading=9)
-qty_style = ParagraphStyle(name='Quantity', fontName='Helvetica', fontSize=8, alignment=TA_CENTER, leading=11)
+CONTENT_TOP_OFFSET = 0.8 * cm
+
+# Name of the PDF form holding the border box, shared by every page
+BORDER_FORM_NAME = 'border'
+
+# Rendering is split across processes only for larger files, since starting workers has a fixed cost
+PARALLEL_MIN_ROWS = 500
+STICKERS_PER_CHUNK = 250
+
+# Each worker re-imports streamlit, pandas and reportlab (well over 100 MB), so keep the pool small
+MAX_WORKERS = 4
+
+# Parsed uploads kept in the cache, and for how long (seconds)
+UPLOAD_CACHE_MAX_ENTRIES = 8
+UPLOAD_CACHE_TTL = 3600
+
+# The calamine engine reads Excel files much faster than openpyxl, use it when installed
+CALAMINE_AVAILABLE = importlib.util.find_spec('python_calamine') is not None
+
+# Column keywords, uppercased, in order of preference - Updated for your exact column names
+PART_NO_KEYWORDS = ('PART NO', 'PARTNO', 'PART', 'PART_NO', 'PART#')
+DESC_KEYWORDS = ('PART DESC', 'DESC', 'DESCRIPTION', 'NAME', 'PRODUCT_NAME')
+QTY_BIN_KEYWORDS = ('QTY/BIN', 'QTY_BIN', 'QTYBIN', 'QTY', 'QUANTITY')
+
+LINE_LOCATION_KEYWORDS = {
+    'model': ('MODEL', 'BUS MODEL', 'BUS_MODEL', 'BUSMODEL', 'BUS'),
+    'station_no': ('STATION NO', 'STATION_NO', 'STATIONNO', 'STATION'),
+    'rack': ('RACK',),
+    'rack_no_1st': ('RACK NO. (1ST DIGIT)', 'RACK NO (1ST DIGIT)', 'RACK_NO_1ST', 'RACK NO 1ST'),
+    'rack_no_2nd': ('RACK NO. (2ND DIGIT)', 'RACK NO (2ND DIGIT)', 'RACK_NO_2ND', 'RACK NO 2ND'),
+    'level': ('LEVEL',),
+    'cell': ('CELL',)
+}
+
+STORE_LOCATION_KEYWORDS = {
+    'abb_zone': ('ABB FOR ZONE', 'ABB_FOR_ZONE', 'ABB ZONE', 'ABB_ZONE', 'ABBZONE', 'ZONE'),
+    'abb_location': ('ABB FOR LOCATION', 'ABB_FOR_LOCATION', 'ABB LOCATION', 'ABB_LOCATION', 'ABBLOCATION'),
+    'abb_floor': ('ABB FOR FLOOR', 'ABB_FOR_FLOOR', 'ABB FLOOR', 'ABB_FLOOR', 'ABBFLOOR', 'FLOOR'),
+    'abb_rack_no': ('ABB FOR RACK NO', 'ABB_FOR_RACK_NO', 'ABB RACK NO', 'ABB_RACK_NO', 'ABBRACKNO', 'ABB RACK'),
+    'abb_level_in_rack': ('ABB FOR LEVEL IN RACK', 'ABB_FOR_LEVEL_IN_RACK', 'ABB LEVEL IN RACK', 'ABB_LEVEL_IN_RACK', 'ABBLEVELINRACK', 'ABB LEVEL'),
+    'abb_cell': ('ABB FOR CELL', 'ABB_FOR_CELL', 'ABB CELL', 'ABB_CELL', 'ABBCELL'),
+    'abb_no': ('ABB FOR NO', 'ABB_FOR_NO', 'ABB NO', 'ABB_NO', 'ABBNO', 'ABB NUMBER')
+}
+
+# Line spacing of the wrapped part no and description, and how many lines fit their rows
+PART_NO_LEADING = 10
+DESC_LEADING = 9
+PART_NO_MAX_LINES = max(1, round(HEADER_ROW_HEIGHT / PART_NO_LEADING))
+DESC_MAX_LINES = max(1, round(DESC_ROW_HEIGHT / DESC_LEADING))
+
+# Define table styles - Shared by every sticker
+GRID_COLOR = colors.Color(0, 0, 0, alpha=0.95)
+
+# Single table per sticker: column 0 holds the row labels, columns 1-7 the
+# content (spanned for part no, description and quantity) and the 7 location
+# boxes, and column 8 the QR code spanning every row
+STICKER_TABLE_STYLE = TableStyle([
+    ('GRID', (0, 0), (7, -1), 1.0, GRID_COLOR),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (0, 2), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (0, 2), 8),
+    ('FONTNAME', (1, 3), (7, 4), 'Helvetica-Bold'),
+    ('FONTSIZE', (1, 3), (7, 4), 8),
+    ('SPAN', (1, 0), (7, 0)),
+    ('SPAN', (1, 1), (7, 1)),
+    ('SPAN', (1, 2), (7, 2)),
+    ('SPAN', (8, 0), (8, -1)),
+    # Cell text is drawn as plain strings, so fonts are set per cell here
+    ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (1, 0), (1, 0), 9),
+    ('LEADING', (1, 0), (1, 0), PART_NO_LEADING),
+    ('FONTNAME', (1, 1), (1, 1), 'Helvetica'),
+    ('FONTSIZE', (1, 1), (1, 1), 7),
+    ('LEADING', (1, 1), (1, 1), DESC_LEADING),
+    ('ALIGN', (1, 1), (1, 1), 'LEFT'),
+    ('FONTNAME', (1, 2), (1, 2), 'Helvetica'),
+    ('FONTSIZE', (1, 2), (1, 2), 8),
+    ('FONTNAME', (0, 3), (0, 4), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 3), (0, 4), 7),
+    ('FONTNAME', (8, 0), (8, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (8, 0), (8, 0), 10),
+])
+
+# Width available for the part no and description text inside their cell (default 6pt padding on each side)
+CONTENT_TEXT_WIDTH = CONTENT_COL_WIDTH - 12
+
+@st.cache_resource(show_spinner=False)
+def install_package(name):
+    """Install a package with pip, at most once per server process"""
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', name])
+    importlib.invalidate_caches()
+    return True
+
+def ensure_dependencies():
+    """Check for the QR code library and install it if needed
+
+    Only runs when labels are generated, so starting the app does not pay for
+    the probe. The message is shown outside the cached install, so Streamlit
+    does not replay it on later runs.
+    """
+    if importlib.util.find_spec('segno') is None:
+        with st.spinner("Installing segno..."):
+            install_package('segno')
+
+@lru_cache(maxsize=4096)
+def qr_png_bytes(data_string):
+    """Encode the data string as a QR code and return the PNG bytes (cached per payload)"""
+    import segno
+
+    # Create QR code with the smallest version that fits the data
+    qr = segno.make(data_string, error='M', micro=False)
+    
+    # Segno writes the PNG itself, no PIL image is needed. The image is drawn at
+    # 1.5cm, so 2 pixels per module is already more than the page resolution needs
+    img_buffer = BytesIO()
+    qr.save(img_buffer, kind='png', scale=2, border=2)
+    return img_buffer.getvalue()
 
 def generate_qr_code(data_string):
     """Generate a QR code from the given data string"""
     try:
-        # Create QR code instance
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        
-        # Add data
-        qr.add_data(data_string)
-        qr.make(fit=True)
-        
-        # Create QR code image
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert PIL image to bytes that reportlab can use
-        img_buffer = BytesIO()
-        qr_img.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
+        # Wrap the cached PNG in a fresh buffer since reportlab consumes the file-like object
+        img_buffer = BytesIO(qr_png_bytes(data_string))
         
         # Create a QR code image with fixed size
         return Image(img_buffer, width=1.5*cm, height=1.5*cm)
@@ -85,120 +183,242 @@ def generate_qr_code(data_string):
         st.error(f"Error generating QR code: {e}")
         return None
 
-def find_column(df, keywords):
-    """Find a column in the DataFrame that matches any of the keywords (case-insensitive)"""
-    cols = df.columns.tolist()
-    for keyword in keywords:
-        for col in cols:
-            if isinstance(col, str) and keyword.upper() in col.upper():
+def uppercase_columns(df):
+    """Map uppercased names of the string columns to the column, in column order"""
+    upper_columns = {}
+    for col in df.columns.tolist():
+        if isinstance(col, str):
+            upper_columns.setdefault(col.upper(), col)
+    return upper_columns
+
+def find_column(df, keywords, upper_columns=None):
+    """Find a column in the DataFrame that matches any of the keywords (case-insensitive)
+
+    A column named exactly like the keyword is preferred, otherwise the first
+    column containing it is used. Pass the result of uppercase_columns(df) as
+    upper_columns to avoid re-uppercasing every column name when looking up
+    several fields.
+    """
+    if upper_columns is None:
+        upper_columns = uppercase_columns(df)
+    keywords_upper = [keyword.upper() for keyword in keywords]
+    for keyword_upper in keywords_upper:
+        if keyword_upper in upper_columns:
+            return upper_columns[keyword_upper]
+        for col_upper, col in upper_columns.items():
+            if keyword_upper in col_upper:
                 return col
     return None
 
-def extract_line_location_components(row, columns):
-    """Extract components for Line Location (L.LOC) from specific columns"""
-    components = [''] * 7
-    
-    # Extract values from respective columns
-    if columns['model'] and columns['model'] in row:
-        components[0] = str(row[columns['model']]) if pd.notna(row[columns['model']]) else ""
-    
-    if columns['station_no'] and columns['station_no'] in row:
-        components[1] = str(row[columns['station_no']]) if pd.notna(row[columns['station_no']]) else ""
-    
-    if columns['rack'] and columns['rack'] in row:
-        components[2] = str(row[columns['rack']]) if pd.notna(row[columns['rack']]) else ""
-    
-    # Extract first digit from separate column
-    if columns['rack_no_1st'] and columns['rack_no_1st'] in row:
-        components[3] = str(row[columns['rack_no_1st']]) if pd.notna(row[columns['rack_no_1st']]) else ""
-    
-    # Extract second digit from separate column
-    if columns['rack_no_2nd'] and columns['rack_no_2nd'] in row:
-        components[4] = str(row[columns['rack_no_2nd']]) if pd.notna(row[columns['rack_no_2nd']]) else ""
-    
-    if columns['level'] and columns['level'] in row:
-        components[5] = str(row[columns['level']]) if pd.notna(row[columns['level']]) else ""
-    
-    if columns['cell'] and columns['cell'] in row:
-        components[6] = str(row[columns['cell']]) if pd.notna(row[columns['cell']]) else ""
-    
+def column_positions(df, columns):
+    """Resolve column names to positional indices, using -1 for columns that were not found"""
+    names = list(columns.values()) if isinstance(columns, dict) else list(columns)
+    positions = df.columns.get_indexer([name for name in names if name is not None]).tolist()
+    return [positions.pop(0) if name is not None else -1 for name in names]
+
+def extract_text_columns(df, positions):
+    """Extract the columns at the given positions for every row as an (N, len(positions)) array of strings
+
+    Missing columns and missing values become empty strings. The conversion is
+    done once on the whole frame rather than cell by cell.
+    """
+    components = np.full((len(df), len(positions)), '', dtype=object)
+    found = [i for i, pos in enumerate(positions) if pos >= 0]
+    if found:
+        values = df.iloc[:, [positions[i] for i in found]].astype('string').fillna('')
+        components[:, found] = values.to_numpy(dtype=object)
     return components
 
-def extract_store_location_components(row, columns):
-    """Extract components for Store Location (S.LOC) from ABB columns"""
-    components = [''] * 7
-    
-    # Extract values from ABB columns
-    if columns['abb_zone'] and columns['abb_zone'] in row:
-        components[0] = str(row[columns['abb_zone']]) if pd.notna(row[columns['abb_zone']]) else ""
-    
-    if columns['abb_location'] and columns['abb_location'] in row:
-        components[1] = str(row[columns['abb_location']]) if pd.notna(row[columns['abb_location']]) else ""
-    
-    if columns['abb_floor'] and columns['abb_floor'] in row:
-        components[2] = str(row[columns['abb_floor']]) if pd.notna(row[columns['abb_floor']]) else ""
-    
-    if columns['abb_rack_no'] and columns['abb_rack_no'] in row:
-        components[3] = str(row[columns['abb_rack_no']]) if pd.notna(row[columns['abb_rack_no']]) else ""
-    
-    if columns['abb_level_in_rack'] and columns['abb_level_in_rack'] in row:
-        components[4] = str(row[columns['abb_level_in_rack']]) if pd.notna(row[columns['abb_level_in_rack']]) else ""
-    
-    if columns['abb_cell'] and columns['abb_cell'] in row:
-        components[5] = str(row[columns['abb_cell']]) if pd.notna(row[columns['abb_cell']]) else ""
-    
-    if columns['abb_no'] and columns['abb_no'] in row:
-        components[6] = str(row[columns['abb_no']]) if pd.notna(row[columns['abb_no']]) else ""
-    
-    return components
+def extract_line_location_components(df, positions):
+    """Extract components for Line Location (L.LOC) from specific columns
+
+    Positions follow the order model, station_no, rack, rack_no_1st,
+    rack_no_2nd, level, cell.
+    """
+    return extract_text_columns(df, positions)
+
+def extract_store_location_components(df, positions):
+    """Extract components for Store Location (S.LOC) from ABB columns
+
+    Positions follow the order abb_zone, abb_location, abb_floor, abb_rack_no,
+    abb_level_in_rack, abb_cell, abb_no.
+    """
+    return extract_text_columns(df, positions)
+
+def define_border_form(canvas):
+    """Record the border box around the sticker content as a reusable form
+
+    Must be called on a fresh canvas before anything is drawn; every page then
+    references the form instead of repeating the drawing operators.
+    """
+    canvas.beginForm(BORDER_FORM_NAME)
+    canvas.saveState()
+    x_offset = CONTENT_LEFT_OFFSET
+    y_offset = STICKER_HEIGHT - CONTENT_BOX_HEIGHT - CONTENT_TOP_OFFSET
+    # Opaque stroke: an alpha would need an ExtGState, which reportlab does not
+    # declare in the form's own resources
+    canvas.setStrokeColor(colors.black)
+    canvas.setLineWidth(1.5)
+    canvas.rect(
+        x_offset,
+        y_offset,
+        CONTENT_BOX_WIDTH,
+        CONTENT_BOX_HEIGHT
+    )
+    canvas.restoreState()
+    canvas.endForm()
+
+def draw_border(canvas):
+    """Draw the border box around the sticker content"""
+    canvas.doForm(BORDER_FORM_NAME)
+
+def wrap_cell_text(text, font_name, font_size, width, max_lines):
+    """Wrap text into at most max_lines lines that fit the given width
+
+    Words too long for one line are broken by characters in a single forward
+    pass. Lines past max_lines would not be visible in the cell, so wrapping
+    stops there.
+    """
+    lines = []
+    for line in simpleSplit(text, font_name, font_size, width):
+        if stringWidth(line, font_name, font_size) <= width:
+            lines.append(line)
+        else:
+            # simpleSplit only breaks on spaces, so cut long part numbers and codes by characters
+            current, current_width = '', 0
+            for char in line:
+                char_width = stringWidth(char, font_name, font_size)
+                if current and current_width + char_width > width:
+                    lines.append(current)
+                    if len(lines) >= max_lines:
+                        break
+                    current, current_width = '', 0
+                current += char
+                current_width += char_width
+            else:
+                lines.append(current)
+        if len(lines) >= max_lines:
+            break
+    return "\n".join(lines[:max_lines])
+
+def build_sticker_table(part_no, desc, qty_bin, line_location_parts, store_location_parts):
+    """Build the content table for a single sticker"""
+    # Generate QR code with part information
+    qr_data = f"Part No: {part_no}\nDescription: {desc}\nQTY/BIN: {qty_bin}\n"
+    qr_data += f"Line Location: {' | '.join(line_location_parts)}\n"
+    qr_data += f"Store Location: {' | '.join(store_location_parts)}"
+
+    qr_image = generate_qr_code(qr_data)
+    qr_cell = qr_image if qr_image else "QR"
+
+    # Plain strings are cheaper than Paragraphs; part no and description are pre-wrapped to their cell
+    part_no_text = wrap_cell_text(part_no, 'Helvetica-Bold', 9, CONTENT_TEXT_WIDTH, PART_NO_MAX_LINES)
+    desc_text = desc[:30] + "..." if len(desc) > 30 else desc
+    desc_text = wrap_cell_text(desc_text, 'Helvetica', 7, CONTENT_TEXT_WIDTH, DESC_MAX_LINES)
+
+    # Row labels, content and location boxes, with the QR code in the last column
+    spanned = [''] * 6
+    table_data = [
+        ["Part No", part_no_text] + spanned + [qr_cell],
+        ["Desc", desc_text] + spanned + [''],
+        ["Q/B", qty_bin] + spanned + [''],
+        ["S.LOC"] + list(store_location_parts) + [''],
+        ["L.LOC"] + list(line_location_parts) + [''],
+    ]
+
+    sticker_table = Table(table_data, colWidths=STICKER_COL_WIDTHS, rowHeights=STICKER_ROW_HEIGHTS)
+    sticker_table.setStyle(STICKER_TABLE_STYLE)
+
+    return sticker_table
+
+def draw_sticker(canvas, sticker_table):
+    """Draw one sticker inside the border box on the current page and start a new page"""
+    draw_border(canvas)
+    content_top = STICKER_HEIGHT - CONTENT_TOP_OFFSET
+    width, height = sticker_table.wrapOn(canvas, CONTENT_BOX_WIDTH, CONTENT_BOX_HEIGHT)
+    sticker_table.drawOn(canvas, CONTENT_LEFT_OFFSET, content_top - height)
+    canvas.showPage()
+
+def create_temp_pdf_path():
+    """Create an empty temporary PDF file and return its path"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+    temp_file.close()
+    return temp_file.name
+
+def render_sticker_pdf(records, path, on_sticker=None):
+    """Render one sticker page per record into a PDF file at path
+
+    Each sticker is drawn straight onto its own page, so its table and cells
+    can be freed as soon as the page is emitted. The canvas still buffers every
+    finished page's content stream and image until save(), so memory grows
+    with the number of stickers, just far less per sticker than when every
+    flowable was collected first. Records are tuples of part_no, desc,
+    qty_bin, line_location_parts and store_location_parts.
+    """
+    pdf_canvas = Canvas(path, pagesize=STICKER_PAGESIZE)
+    define_border_form(pdf_canvas)
+    for index, record in enumerate(records):
+        if on_sticker:
+            on_sticker(index)
+        draw_sticker(pdf_canvas, build_sticker_table(*record))
+    pdf_canvas.save()
+    return path
+
+def available_cpus():
+    """Return the number of CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # sched_getaffinity is not available on macOS and Windows
+        return os.cpu_count() or 1
+
+def worker_count(total_rows):
+    """Return how many worker processes to render total_rows stickers with"""
+    chunk_count = math.ceil(total_rows / STICKERS_PER_CHUNK)
+    return max(1, min(chunk_count, available_cpus(), MAX_WORKERS))
+
+def render_sticker_pdf_parallel(records, path, workers, progress_bar=None):
+    """Render stickers in chunks across worker processes and merge the chunk PDFs into path"""
+    # Streamlit runs this script as __main__, whose functions worker processes
+    # cannot unpickle, so hand them the function from the importable module
+    worker = importlib.import_module(os.path.splitext(os.path.basename(__file__))[0]).render_sticker_pdf
+
+    chunks = [records[i:i + STICKERS_PER_CHUNK] for i in range(0, len(records), STICKERS_PER_CHUNK)]
+    chunk_paths = [create_temp_pdf_path() for _ in chunks]
+    try:
+        # The Streamlit server is multi-threaded, and forking a threaded process can
+        # deadlock the child, so start workers with spawn
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(worker, chunk, chunk_path) for chunk, chunk_path in zip(chunks, chunk_paths)]
+            for done, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                if progress_bar:
+                    progress_bar.progress(done / len(futures))
+
+        # Merge the chunks in their original order
+        writer = PdfWriter()
+        for chunk_path in chunk_paths:
+            writer.append(chunk_path)
+        with open(path, 'wb') as pdf_file:
+            writer.write(pdf_file)
+    finally:
+        for chunk_path in chunk_paths:
+            os.unlink(chunk_path)
+    return path
 
 def generate_sticker_labels(df, progress_bar=None, status_container=None):
     """Generate sticker labels with QR code from DataFrame"""
-    
-    # Create a function to draw the border box around content
-    def draw_border(canvas, doc):
-        canvas.saveState()
-        x_offset = CONTENT_LEFT_OFFSET
-        y_offset = STICKER_HEIGHT - CONTENT_BOX_HEIGHT - 0.8*cm
-        canvas.setStrokeColor(colors.Color(0, 0, 0, alpha=0.95))
-        canvas.setLineWidth(1.5)
-        canvas.rect(
-            x_offset,
-            y_offset,
-            CONTENT_BOX_WIDTH,
-            CONTENT_BOX_HEIGHT
-        )
-        canvas.restoreState()
-
     # Identify columns (case-insensitive) - Updated for your exact column names
-    original_columns = df.columns.tolist()
+    upper_columns = uppercase_columns(df)
     
     # Find basic columns
-    part_no_col = find_column(df, ['PART NO', 'PARTNO', 'PART', 'PART_NO', 'PART#'])
-    desc_col = find_column(df, ['PART DESC', 'DESC', 'DESCRIPTION', 'NAME', 'PRODUCT_NAME'])
-    qty_bin_col = find_column(df, ['QTY/BIN', 'QTY_BIN', 'QTYBIN', 'QTY', 'QUANTITY'])
+    part_no_col = find_column(df, PART_NO_KEYWORDS, upper_columns)
+    desc_col = find_column(df, DESC_KEYWORDS, upper_columns)
+    qty_bin_col = find_column(df, QTY_BIN_KEYWORDS, upper_columns)
     
-    # Find Line Location columns - Updated for your exact column names
-    line_location_columns = {
-        'model': find_column(df, ['MODEL', 'BUS MODEL', 'BUS_MODEL', 'BUSMODEL', 'BUS']),
-        'station_no': find_column(df, ['STATION NO', 'STATION_NO', 'STATIONNO', 'STATION']),
-        'rack': find_column(df, ['RACK']),
-        'rack_no_1st': find_column(df, ['RACK NO. (1ST DIGIT)', 'RACK NO (1ST DIGIT)', 'RACK_NO_1ST', 'RACK NO 1ST']),
-        'rack_no_2nd': find_column(df, ['RACK NO. (2ND DIGIT)', 'RACK NO (2ND DIGIT)', 'RACK_NO_2ND', 'RACK NO 2ND']),
-        'level': find_column(df, ['LEVEL']),
-        'cell': find_column(df, ['CELL'])
-    }
-    
-    # Find Store Location (ABB) columns - Updated for your exact column names
-    store_location_columns = {
-        'abb_zone': find_column(df, ['ABB FOR ZONE', 'ABB_FOR_ZONE', 'ABB ZONE', 'ABB_ZONE', 'ABBZONE', 'ZONE']),
-        'abb_location': find_column(df, ['ABB FOR LOCATION', 'ABB_FOR_LOCATION', 'ABB LOCATION', 'ABB_LOCATION', 'ABBLOCATION']),
-        'abb_floor': find_column(df, ['ABB FOR FLOOR', 'ABB_FOR_FLOOR', 'ABB FLOOR', 'ABB_FLOOR', 'ABBFLOOR', 'FLOOR']),
-        'abb_rack_no': find_column(df, ['ABB FOR RACK NO', 'ABB_FOR_RACK_NO', 'ABB RACK NO', 'ABB_RACK_NO', 'ABBRACKNO', 'ABB RACK']),
-        'abb_level_in_rack': find_column(df, ['ABB FOR LEVEL IN RACK', 'ABB_FOR_LEVEL_IN_RACK', 'ABB LEVEL IN RACK', 'ABB_LEVEL_IN_RACK', 'ABBLEVELINRACK', 'ABB LEVEL']),
-        'abb_cell': find_column(df, ['ABB FOR CELL', 'ABB_FOR_CELL', 'ABB CELL', 'ABB_CELL', 'ABBCELL']),
-        'abb_no': find_column(df, ['ABB FOR NO', 'ABB_FOR_NO', 'ABB NO', 'ABB_NO', 'ABBNO', 'ABB NUMBER'])
-    }
+    # Find Line Location and Store Location (ABB) columns
+    line_location_columns = {key: find_column(df, keywords, upper_columns) for key, keywords in LINE_LOCATION_KEYWORDS.items()}
+    store_location_columns = {key: find_column(df, keywords, upper_columns) for key, keywords in STORE_LOCATION_KEYWORDS.items()}
 
     if status_container:
         status_container.write("**Using columns:**")
@@ -212,211 +432,53 @@ def generate_sticker_labels(df, progress_bar=None, status_container=None):
         for key, col in store_location_columns.items():
             status_container.write(f"- {key}: {col}")
 
-    # Create temporary file for PDF output
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    temp_path = temp_file.name
-    temp_file.close()
-
-    # Create document with minimal margins
-    doc = SimpleDocTemplate(temp_path, pagesize=STICKER_PAGESIZE,
-                          topMargin=0.1*cm, bottomMargin=0.1*cm,
-                          leftMargin=0.1*cm, rightMargin=0.1*cm)
-
-    all_elements = []
-
-    # Process each row as a single sticker
-    total_rows = len(df)
-    for index, row in df.iterrows():
-        # Update progress
-        if progress_bar:
-            progress_bar.progress((index + 1) / total_rows)
-        
-        if status_container:
-            status_container.write(f"Creating sticker {index+1} of {total_rows}")
-        
-        elements = []
-
-        # Extract basic data
-        part_no = str(row[part_no_col]) if part_no_col and part_no_col in row else ""
-        desc = str(row[desc_col]) if desc_col and desc_col in row else ""
-        qty_bin = str(row[qty_bin_col]) if qty_bin_col and qty_bin_col in row and pd.notna(row[qty_bin_col]) else ""
-        
-        # Extract Line Location components
-        line_location_parts = extract_line_location_components(row, line_location_columns)
-        
-        # Extract Store Location components
-        store_location_parts = extract_store_location_components(row, store_location_columns)
+    # Resolve column names to positions once so every field is read by integer index
+    basic_positions = column_positions(df, [part_no_col, desc_col, qty_bin_col])
+    line_location_positions = column_positions(df, line_location_columns)
+    store_location_positions = column_positions(df, store_location_columns)
 
-        # Generate QR code with part information
-        qr_data = f"Part No: {part_no}\nDescription: {desc}\nQTY/BIN: {qty_bin}\n"
-        qr_data += f"Line Location: {' | '.join(line_location_parts)}\n"
-        qr_data += f"Store Location: {' | '.join(store_location_parts)}"
-        
-        qr_image = generate_qr_code(qr_data)
-        
-        # Define row heights - Fixed sizes as per original
-        header_row_height = 0.6*cm
-        desc_row_height = 0.8*cm
-        qty_row_height = 0.5*cm
-        location_row_height = 0.5*cm
-
-        # Fixed dimensions
-        qr_width = 1.5*cm  
-        main_content_width = CONTENT_BOX_WIDTH - qr_width
-
-        # Main table data - Fixed column widths
-        header_col_width = main_content_width * 0.22
-        content_col_width = main_content_width * 0.71
-        
-        main_table_data = [
-            ["Part No", Paragraph(f"{part_no}", bold_style)],
-            ["Desc", Paragraph(desc[:30] + "..." if len(desc) > 30 else desc, desc_style)],
-            ["Q/B", Paragraph(str(qty_bin), qty_style)]
-        ]
-
-        # Create main table with fixed column widths
-        main_table = Table(main_table_data,
-                         colWidths=[header_col_width, content_col_width],
-                         rowHeights=[header_row_height, desc_row_height, qty_row_height])
-
-        main_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1.0, colors.Color(0, 0, 0, alpha=0.95)),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (0, -1), 8),
-        ]))
-
-        # Store Location section - Fixed layout
-        store_loc_label = Paragraph("S.LOC", ParagraphStyle(
-            name='StoreLoc', fontName='Helvetica-Bold', fontSize=7, alignment=TA_CENTER
-        ))
-
-        # Fixed width for the inner columns
-        inner_table_width = content_col_width
-        
-        # Calculate column widths based on fixed proportions 
-        total_proportion = sum(COLUMN_WIDTH_PROPORTIONS)
-        inner_col_widths = [w * inner_table_width / total_proportion for w in COLUMN_WIDTH_PROPORTIONS]
-
-        store_loc_inner_table = Table(
-            [store_location_parts],
-            colWidths=inner_col_widths,
-            rowHeights=[location_row_height]
-        )
+    # Convert all used columns to strings in one pass over the frame
+    basic_rows = extract_text_columns(df, basic_positions).tolist()
+    line_location_rows = extract_line_location_components(df, line_location_positions).tolist()
+    store_location_rows = extract_store_location_components(df, store_location_positions).tolist()
 
-        store_loc_inner_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1.0, colors.Color(0, 0, 0, alpha=0.95)),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ]))
-
-        store_loc_table = Table(
-            [[store_loc_label, store_loc_inner_table]],
-            colWidths=[header_col_width, inner_table_width],
-            rowHeights=[location_row_height]
-        )
+    # Collect the text for every sticker so it can be rendered here or in worker processes
+    records = [
+        (part_no, desc, qty_bin, line_location_parts, store_location_parts)
+        for (part_no, desc, qty_bin), line_location_parts, store_location_parts
+        in zip(basic_rows, line_location_rows, store_location_rows)
+    ]
 
-        store_loc_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1.0, colors.Color(0, 0, 0, alpha=0.95)),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-
-        # Line Location section - Fixed layout
-        line_loc_label = Paragraph("L.LOC", ParagraphStyle(
-            name='LineLoc', fontName='Helvetica-Bold', fontSize=7, alignment=TA_CENTER
-        ))
-        
-        # Create the inner table for line location parts using the same fixed widths
-        line_loc_inner_table = Table(
-            [line_location_parts],
-            colWidths=inner_col_widths,
-            rowHeights=[location_row_height]
-        )
-        
-        line_loc_inner_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1.0, colors.Color(0, 0, 0, alpha=0.95)),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8)
-        ]))
-        
-        # Wrap the label and the inner table in a containing table
-        line_loc_table = Table(
-            [[line_loc_label, line_loc_inner_table]],
-            colWidths=[header_col_width, inner_table_width],
-            rowHeights=[location_row_height]
-        )
-
-        line_loc_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1.0, colors.Color(0, 0, 0, alpha=0.95)),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+    # Create temporary file for PDF output
+    temp_path = create_temp_pdf_path()
 
-        # Create main content table (combining all the content tables vertically)
-        total_main_height = header_row_height + desc_row_height + qty_row_height
-        
-        main_content_table = Table(
-            [[main_table], [store_loc_table], [line_loc_table]],
-            colWidths=[main_content_width],
-            rowHeights=[total_main_height, location_row_height, location_row_height]
-        )
+    # Process each row as a single sticker
+    total_rows = len(records)
+    workers = worker_count(total_rows)
+    try:
+        ensure_dependencies()
 
-        main_content_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-
-        # QR code table - Fixed positioning
-        if qr_image:
-            qr_table = Table(
-                [[qr_image]],
-                colWidths=[qr_width], 
-                rowHeights=[CONTENT_BOX_HEIGHT]
-            )
+        if workers > 1 and total_rows >= PARALLEL_MIN_ROWS:
+            if status_container:
+                status_container.write(f"Creating {total_rows} stickers using {workers} processes")
+            render_sticker_pdf_parallel(records, temp_path, workers, progress_bar)
         else:
-            qr_table = Table(
-                [[Paragraph("QR", ParagraphStyle(
-                    name='QRPlaceholder', fontName='Helvetica-Bold', fontSize=10, alignment=TA_CENTER
-                ))]],
-                colWidths=[qr_width],
-                rowHeights=[CONTENT_BOX_HEIGHT]
-            )
-
-        qr_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-
-        # Final layout with fixed dimensions
-        final_table = Table(
-            [[main_content_table, qr_table]],
-            colWidths=[main_content_width, qr_width],
-            rowHeights=[CONTENT_BOX_HEIGHT]
-        )
+            # Each update is a round-trip to the browser, so only send about 100 of them
+            update_every = max(1, total_rows // 100)
 
-        final_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+            def on_sticker(index):
+                if index % update_every != 0 and index != total_rows - 1:
+                    return
 
-        # Fixed spacer
-        elements.append(Spacer(1, 0.3*cm))
-        elements.append(final_table)
-
-        # Add all elements for this sticker to the document
-        all_elements.extend(elements)
+                # Update progress
+                if progress_bar:
+                    progress_bar.progress((index + 1) / total_rows)
+                
+                if status_container:
+                    status_container.write(f"Creating sticker {index+1} of {total_rows}")
 
-        # Add page break after each sticker (except the last one)
-        if index < len(df) - 1:
-            all_elements.append(PageBreak())
+            render_sticker_pdf(records, temp_path, on_sticker)
 
-    # Build the document
-    try:
-        doc.build(all_elements, onFirstPage=draw_border, onLaterPages=draw_border)
         if status_container:
             status_container.success("PDF generated successfully!")
         return temp_path
@@ -425,6 +487,24 @@ def generate_sticker_labels(df, progress_bar=None, status_container=None):
             status_container.error(f"Error building PDF: {e}")
         return None
 
+@st.cache_data(max_entries=UPLOAD_CACHE_MAX_ENTRIES, ttl=UPLOAD_CACHE_TTL)
+def load_dataframe(file_bytes, file_name):
+    """Read an uploaded Excel or CSV file into a DataFrame
+
+    Cached on the file contents, so widget interactions that rerun the script
+    do not parse the same upload again. The cache is bounded in size and age
+    so uploads from past sessions do not stay in memory on a shared server.
+    """
+    if file_name.lower().endswith('.csv'):
+        return pd.read_csv(BytesIO(file_bytes))
+    if CALAMINE_AVAILABLE:
+        try:
+            return pd.read_excel(BytesIO(file_bytes), engine='calamine')
+        except ValueError:
+            # Older pandas releases do not know the calamine engine
+            pass
+    return pd.read_excel(BytesIO(file_bytes))
+
 def main():
     st.set_page_config(
         page_title="Tote Label Generator",
@@ -460,10 +540,7 @@ def main():
         if uploaded_file is not None:
             try:
                 # Read the file
-                if uploaded_file.name.lower().endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
-                else:
-                    df = pd.read_excel(uploaded_file)
+                df = load_dataframe(uploaded_file.getvalue(), uploaded_file.name)
                 
                 st.subheader("📊 Data Preview")
                 st.write(f"**Total rows:** {len(df)}")